@@ -1,10 +1,118 @@
-import pandas as pd
-from flask import Flask
+import csv
+import functools
+import gzip
+import hashlib
+import os
+import orjson
+from flask import Flask, request
 from pyluach import dates, hebrewcal, parshios
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 
 app = Flask(__name__)
 
+# Ler a tabela de produtos uma única vez ao iniciar a API
+with open('kosherProducts.csv', newline = '', encoding = 'utf-8') as f:
+  _PRODUTOS_JSON = orjson.dumps(
+    {str(i): row for i, row in enumerate(csv.DictReader(f))})
+_PRODUTOS_GZ = gzip.compress(_PRODUTOS_JSON, compresslevel = 6, mtime = 0)
+_PRODUTOS_MTIME = datetime.fromtimestamp(
+  os.stat('kosherProducts.csv').st_mtime, timezone.utc)
+
+# Funções auxiliares
+# Anos bissextos do ciclo de 19 anos, um bit por posição no ciclo
+_LEAP_MASK = 0
+for _y in range(19):
+  if (((_y*7)+1) % 19) < 7:
+    _LEAP_MASK |= 1 << _y
+
+# Identificar ano bissexto para o mês de ADAR
+def hebrew_leap(year):
+  return bool((_LEAP_MASK >> (year % 19)) & 1)
+
+# Nomes dos meses, indexados pelo número do mês (posição 0 não é usada)
+_HMONTHS = (None, "Nisan", "Iyyar", "Sivan", "Tammuz", "Av", "Elul", "Tishri",
+  "Heshvan", "Kislev", "Teveth", "Shevat", "Adar", "Adar II")
+
+_GMONTHS = (None, 'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
+  'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro')
+
+# Nome do mês judaico incluindo ADAR II
+def hebrew_month(htoday):
+  # Em ano bissexto o mês 12 é o ADAR I
+  if htoday.month == 12 and hebrew_leap(htoday.year):
+    return "Adar I"
+  return _HMONTHS[htoday.month]
+
+# Nome do mês gregoriano
+def greg_month(mes):
+  return _GMONTHS[mes]
+
+
+# Os dados de /date e /parashat só mudam na virada do dia, então o JSON
+# é calculado uma vez por data (ordinal gregoriano) e reaproveitado
+@functools.lru_cache(maxsize=4)
+def _hdate_for(ordinal):
+  date_atual = date.fromordinal(ordinal)
+
+  today = dates.GregorianDate(date_atual.year, date_atual.month, date_atual.day)
+
+  htoday = today.to_heb()
+
+  # Montar o JSON direto de um dicionário, no mesmo formato que o DataFrame gerava
+  data = {
+    "gregorian_date" : {"dia" : date_atual.day, "mes" : greg_month(date_atual.month), "ano" : date_atual.year},
+    "hebrew_date" : {"dia" : htoday.day, "mes" : hebrew_month(htoday), "ano" : htoday.year}}
+
+  return orjson.dumps(data)
+
+@functools.lru_cache(maxsize=4)
+def _parashat_for(ordinal):
+  date_atual = date.fromordinal(ordinal)
+
+  today = dates.GregorianDate(date_atual.year, date_atual.month, date_atual.day)
+
+  data = {
+    "parashatHashavua" : {"parashat_br" : parshios.getparsha_string(today),
+    "parashat_il" : parshios.getparsha_string(today, hebrew=True)}}
+
+  return orjson.dumps(data)
+
+# Tabelas da data e da parashá para os próximos 400 dias, calculadas ao iniciar a API
+_hoje = date.today().toordinal()
+_HDATE_TABLE = {n: _hdate_for(n) for n in range(_hoje, _hoje + 400)}
+_PARASHAT_TABLE = {n: _parashat_for(n) for n in range(_hoje, _hoje + 400)}
+
+# ETag de cada corpo de resposta, calculado uma vez por payload
+@functools.lru_cache(maxsize=1024)
+def _etag(body):
+  return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+# Resposta JSON a partir dos bytes já serializados, sem reencodar a cada requisição.
+# Com ETag/Last-Modified o cliente que já tem o corpo recebe só um 304
+def _json_response(payload, last_modified, max_age, payload_gz = None):
+  body = payload
+  # Versão comprimida só quando existir e o cliente aceitar gzip
+  if payload_gz is not None and request.accept_encodings['gzip'] > 0:
+    body = payload_gz
+  response = app.response_class(body, mimetype = 'application/json')
+  if body is payload_gz:
+    response.headers['Content-Encoding'] = 'gzip'
+  if payload_gz is not None:
+    response.vary.add('Accept-Encoding')
+  response.set_etag(_etag(body))
+  response.last_modified = last_modified
+  response.cache_control.public = True
+  response.cache_control.max_age = max_age
+  return response.make_conditional(request)
+
+# Dia atual (ordinal), início do dia e segundos que faltam para a virada
+# (horário local), tudo a partir de uma única leitura do relógio
+def _dia_atual():
+  agora = datetime.now().astimezone()
+  meia_noite = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+  restante = (meia_noite + timedelta(days=1) - agora).total_seconds()
+  return agora.toordinal(), meia_noite, max(int(restante), 1)
+
 # Routes
 @app.route('/')
 def homepage():
@@ -12,110 +120,23 @@ def homepage():
 
 @app.route('/produtos')
 def produtos():
-  table = pd.read_csv('kosherProducts.csv')
-  jtable = table.to_json(orient = 'index')
-  return jtable
+  return _json_response(_PRODUTOS_JSON, _PRODUTOS_MTIME, 3600, _PRODUTOS_GZ)
 
 @app.route('/date')
 def hdate():
-  # Identificar ano bissexto para o mês de ADAR
-  def hebrew_leap(year):
-    if ((((year*7)+1) % 19) < 7):
-      return True
-    else:
-      return False
-  
-  # Nome do mês judaico incluindo ADAR II
-  def hebrew_month(htoday):
-    if htoday.month == 1:
-      return("Nisan")
-    elif htoday.month == 2:
-      return("Iyyar")
-    elif htoday.month == 3:
-      return("Sivan")
-    elif htoday.month == 4:
-      return("Tammuz")
-    elif htoday.month == 5:
-      return("Av")
-    elif htoday.month == 6:
-      return("Elul")
-    elif htoday.month == 7:
-      return("Tishri")
-    elif htoday.month == 8:
-      return("Heshvan")
-    elif htoday.month == 9:
-      return("Kislev")
-    elif htoday.month == 10:
-      return("Teveth")
-    elif htoday == 11:
-      return("Shevat")
-    elif htoday == 12:
-      if htoday.hebrew_leap(htoday.year):
-        return("Adar I")
-      else:
-        return("Adar")
-      
-    elif htoday == 13:
-      return("Adar II")
-  
-  
-  # Nome do mês gregoriano
-  def greg_month(mes):
-    if mes == 1:
-      return 'janeiro'
-    elif mes == 2:
-      return 'fevereiro'
-    elif mes == 3:
-      return 'março'
-    elif mes == 4:
-      return 'abril'
-    elif mes == 5:
-      return 'maio'
-    elif mes == 6:
-      return 'junho'
-    elif mes == 7:
-      return 'julho'
-    elif mes == 8:
-      return 'agosto'
-    elif mes == 9:
-      return 'setembro'
-    elif mes == 10:
-      return 'outubro'
-    elif mes == 11:
-      return 'novembro'
-    elif mes == 12:
-      return 'dezembro'
-  
-      
-  
-  
-  htoday = dates.HebrewDate.today()
-  
-  date_atual = date.today()
-  
-  today = dates.GregorianDate(date_atual.year, date_atual.month, date_atual.day)
-  
-  # Transformar dados em DataFrame com pandas para ficar fácil a conversão para o JSON
-  df = pd.DataFrame(
-  {"gregorian_date" : [date_atual.day ,greg_month(date_atual.month), date_atual.year],
-  "hebrew_date" : [htoday.day, hebrew_month(htoday), htoday.year]},
-  index = ['dia', 'mes', 'ano'])
-
-  return df.to_json()
+  ordinal, meia_noite, restante = _dia_atual()
+  # Se a API ficar no ar além da tabela, calcula na hora
+  payload = _HDATE_TABLE.get(ordinal) or _hdate_for(ordinal)
+  return _json_response(payload, meia_noite, restante)
 
 @app.route('/parashat')
 def parashat():
-  date_atual = date.today()
-  
-  today = dates.GregorianDate(date_atual.year, date_atual.month, date_atual.day)  
-
-  df = pd.DataFrame(
-  {"parashatHashavua" : [parshios.getparsha_string(today), parshios.getparsha_string(today, hebrew=True)]},
-  index = ['parashat_br', 'parashat_il'])
-
-  return df.to_json()
-  
+  ordinal, meia_noite, restante = _dia_atual()
+  # Se a API ficar no ar além da tabela, calcula na hora
+  payload = _PARASHAT_TABLE.get(ordinal) or _parashat_for(ordinal)
+  return _json_response(payload, meia_noite, restante)
 
-# Rodar a API
-app.run(host='0.0.0.0')
 
+# Rodar a API (servidor de desenvolvimento; em produção usar o gunicorn)
+if __name__ == '__main__':
+  app.run(host='0.0.0.0')